@@ -70,7 +70,7 @@ from .config import (
     DEFAULT_CONFIG_FILE,
 )
 from .connector import MoltbotConnector, test_gateway_connection
-from .service import install_service, uninstall_service, get_service_status
+from .service import install_service, install_service_and_status, uninstall_service, get_service_status
 
 def find_openclaw_config() -> Optional[Path]:
     """Find the OpenClaw config file."""
@@ -735,10 +735,22 @@ def install_service_command(args: argparse.Namespace) -> int:
     print("Installing agentwatch-cli as a system service...")
     print()
 
-    success, message = install_service(user=getattr(args, 'user', None))
+    user = getattr(args, 'user', None)
+    if not getattr(args, 'verify', False):
+        success, message = install_service(user=user)
+        print(message)
+        return 0 if success else 1
 
+    success, message, is_running, status = install_service_and_status(user)
     print(message)
-    return 0 if success else 1
+    if not success:
+        return 1
+
+    print()
+    print("Service Status")
+    print("=" * 40)
+    print(status)
+    return 0 if is_running else 1
 
 
 def uninstall_service_command(args: argparse.Namespace) -> int:
@@ -753,7 +765,7 @@ def uninstall_service_command(args: argparse.Namespace) -> int:
 
 def service_status_command(args: argparse.Namespace) -> int:
     """Handle the service-status command."""
-    is_running, message = get_service_status()
+    is_running, message = get_service_status(verbose=getattr(args, 'verbose', False))
 
     print("AgentWatch CLI Service Status")
     print("=" * 40)
@@ -762,6 +774,34 @@ def service_status_command(args: argparse.Namespace) -> int:
     return 0
 
 
+def _install_uvloop() -> bool:
+    """
+    Use uvloop for the asyncio event loop when it is installed.
+
+    Skipped on Windows, when AGENTWATCH_UVLOOP=0, or if an event loop is
+    already running in this thread.
+
+    Returns:
+        True if the uvloop event loop policy was installed.
+    """
+    if sys.platform == "win32" or os.environ.get("AGENTWATCH_UVLOOP") == "0":
+        return False
+
+    try:
+        asyncio.get_running_loop()
+        return False
+    except RuntimeError:
+        pass
+
+    try:
+        import uvloop
+    except ImportError:
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
 def main() -> int:
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -849,6 +889,10 @@ def main() -> int:
     install_service_parser.add_argument(
         "--user", help="User to run the service as (Linux only, default: current user)"
     )
+    install_service_parser.add_argument(
+        "--verify", action="store_true",
+        help="Show the service status after installing (exit 1 if not running)"
+    )
 
     # uninstall-service command
     subparsers.add_parser(
@@ -856,9 +900,13 @@ def main() -> int:
     )
 
     # service-status command
-    subparsers.add_parser(
+    service_status_parser = subparsers.add_parser(
         "service-status", help="Check the system service status"
     )
+    service_status_parser.add_argument(
+        "--verbose", "-v", action="store_true",
+        help="Include full systemctl status output with recent logs (Linux only)"
+    )
 
     args = parser.parse_args()
 
@@ -866,6 +914,8 @@ def main() -> int:
         parser.print_help()
         return 0
 
+    _install_uvloop()
+
     # Dispatch to command handler
     handlers = {
         "enroll": enroll_command,
@@ -436,6 +436,9 @@ class MoltbotConnector:
             await self._http_client.aclose()
             self._http_client = None
 
+        if self.gateway_client:
+            await self.gateway_client.disconnect()
+
         if self.sio and self.sio.connected:
             await self.sio.disconnect()
 
@@ -460,8 +463,5 @@ async def test_gateway_connection(config: ConnectorConfig) -> bool:
         True if connection is successful
     """
     gateway_token = get_effective_gateway_token(config)
-    client = MoltbotClient(
-        url=config.gateway_url,
-        token=gateway_token,
-    )
-    return await client.health_check()
+    async with MoltbotClient(url=config.gateway_url, token=gateway_token) as client:
+        return await client.health_check()
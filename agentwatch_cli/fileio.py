@@ -0,0 +1,54 @@
+"""
+File writing helpers shared by the gateway client and the service installer.
+"""
+
+import os
+from pathlib import Path
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to an open file descriptor (one write syscall in practice)."""
+    with open(fd, "wb", buffering=0) as f:
+        view = memoryview(data)
+        while view:
+            view = view[f.write(view):]
+
+
+def write_file(path: Path, data: bytes) -> None:
+    """Create or truncate a file and write bytes to it."""
+    _write_all(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666), data)
+
+
+def replace_file(path: Path, data: bytes) -> None:
+    """
+    Atomically replace a file's contents.
+
+    The data goes to a sibling temp file that is then renamed over the
+    original, so readers (and a crash mid-write) never see a partial file.
+    The original file's permissions are kept; a new file gets the default
+    mode for the current umask.
+
+    Args:
+        path: File to write
+        data: New contents
+    """
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        if mode is not None:
+            # Set explicitly: the mode given to os.open is masked by the umask
+            try:
+                os.fchmod(fd, mode)
+            except BaseException:
+                os.close(fd)
+                raise
+        _write_all(fd, data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
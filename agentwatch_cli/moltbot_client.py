@@ -7,15 +7,82 @@ to ensure fresh context for every question.
 """
 
 import asyncio
+import collections
+import inspect
+import ipaddress
+import itertools
 import json
+import logging
 import os
+import random
+import re
+import secrets
+import threading
 import time
 import uuid
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, Deque, List, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
 import websockets
 from websockets.client import WebSocketClientProtocol
 
+from .fileio import replace_file, write_file
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # Optional speedup (pip install agentwatch-cli[speedups])
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    _json_loads = orjson.loads
+
+    def _json_dumpb(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj)
+
+    def _json_dumpb_pretty(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes indented by two spaces."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+else:
+    _json_loads = json.loads
+
+    def _json_dumpb(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes."""
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def _json_dumpb_pretty(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes indented by two spaces."""
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+# sessions.json is machine-read, so it is written compact unless
+# AGENTWATCH_PRETTY=1 asks for human-readable output
+_dump_sessions = _json_dumpb_pretty if os.environ.get("AGENTWATCH_PRETTY") == "1" else _json_dumpb
+
+
+# Protocol-internal ids (request ids, idempotency keys) only need to be
+# unique, so use a per-process random prefix plus a counter instead of uuid4()
+_ID_PREFIX = f"{os.getpid()}-{secrets.token_hex(4)}"
+_id_counter = itertools.count()
+
+
+def _reset_ids() -> None:
+    """Give a forked child its own id prefix so it cannot repeat the parent's ids."""
+    global _ID_PREFIX, _id_counter
+    _ID_PREFIX = f"{os.getpid()}-{secrets.token_hex(4)}"
+    _id_counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_ids)
+
+
+def _next_id() -> str:
+    """Return a process-unique id for a gateway request."""
+    return f"{_ID_PREFIX}-{next(_id_counter)}"
+
 
 def _detect_framework_paths() -> tuple[Path, Path]:
     """
@@ -47,13 +114,414 @@ def _detect_framework_paths() -> tuple[Path, Path]:
     )
 
 
+class _AgentSnapshot(NamedTuple):
+    """Main-agent state copied into every connector session."""
+
+    skills_snapshot: Optional[Dict[str, Any]] = None
+    system_prompt_report: Optional[Dict[str, Any]] = None
+    model_provider: str = "anthropic"
+    model: str = "claude-opus-4-5"
+    context_tokens: int = 200000
+    auth_profile_override: Optional[str] = None
+    auth_profile_override_source: Optional[str] = None
+
+
+class _ReqState:
+    """Inbox and routing keys of one in-flight chat.send request."""
+
+    __slots__ = ("deque", "waiter", "error", "session_key", "run_id")
+
+    def __init__(self, session_key: str):
+        self.deque: Deque[Dict[str, Any]] = collections.deque()
+        self.waiter: Optional[asyncio.Future] = None
+        self.error: Optional[Exception] = None
+        self.session_key = session_key
+        self.run_id: Optional[str] = None
+
+
+class _MoltbotConnection:
+    """
+    One authenticated gateway WebSocket and its receiver task.
+
+    Shared by every MoltbotClient in the process that talks to the same
+    gateway with the same token; frames are demultiplexed to requests by
+    request id, runId and sessionKey, so clients never see each other's
+    traffic.
+    """
+
+    __slots__ = (
+        "url",
+        "token",
+        "ws_options",
+        "loop",
+        "refcount",
+        "connected",
+        "pending_requests",
+        "by_run_id",
+        "by_session_key",
+        "_ws",
+        "_ws_text_bytes",
+        "_connect_lock",
+        "_connect_params",
+        "_receiver_task",
+    )
+
+    # Static part of the connect handshake params (auth is added per connect)
+    _CONNECT_PARAMS = {
+        "minProtocol": 3,
+        "maxProtocol": 3,
+        "client": {
+            "id": "gateway-client",
+            "mode": "backend",
+            "version": "0.1.0",
+            "platform": "python"
+        },
+        "role": "operator",
+        "scopes": ["operator.read", "operator.write", "operator.admin"],
+    }
+
+    # Static head of every connect frame; only id varies per connect
+    _CONNECT_PREFIX = b'{"type":"req","method":"connect","id":'
+
+    def __init__(self, url: str, token: str, ws_options: Dict[str, Any]):
+        self.url = url
+        self.token = token
+        self.ws_options = ws_options
+        self.loop = asyncio.get_running_loop()
+        self.refcount = 0
+        self.connected = False
+
+        # Message routing for parallel requests of all attached clients
+        self.pending_requests: Dict[str, _ReqState] = {}
+        self.by_run_id: Dict[str, _ReqState] = {}
+        self.by_session_key: Dict[str, _ReqState] = {}
+
+        self._ws: Optional[WebSocketClientProtocol] = None
+        self._ws_text_bytes = False
+        self._connect_lock = asyncio.Lock()
+        # Handshake params never change for a connection, so encode them once
+        self._connect_params = _json_dumpb({**self._CONNECT_PARAMS, "auth": {"token": token}})
+        self._receiver_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def acquire(cls, url: str, token: str, ws_options: Dict[str, Any]) -> "_MoltbotConnection":
+        """
+        Return the shared connection for (url, token), creating it if needed.
+
+        The first client to attach decides the websockets.connect() options.
+        Connections are bound to the event loop that created them, so a new
+        one is made if the process has since moved to another loop.
+
+        Args:
+            url: Normalized gateway WebSocket URL
+            token: Gateway authentication token
+            ws_options: Options for websockets.connect()
+
+        Returns:
+            The shared connection, with its reference count incremented
+        """
+        key = (url, token)
+        conn = _SHARED_CONNECTIONS.get(key)
+        if conn is None or conn.loop is not asyncio.get_running_loop():
+            conn = cls(url, token, ws_options)
+            _SHARED_CONNECTIONS[key] = conn
+        conn.refcount += 1
+        return conn
+
+    async def release(self) -> None:
+        """Drop one reference; close the socket when the last client detaches."""
+        self.refcount -= 1
+        if self.refcount > 0:
+            return
+
+        key = (self.url, self.token)
+        if _SHARED_CONNECTIONS.get(key) is self:
+            del _SHARED_CONNECTIONS[key]
+        await self.close()
+
+    async def connect(self) -> bool:
+        """
+        Connect to the gateway and complete handshake.
+
+        Concurrent callers share a single handshake; a stale socket left
+        behind by a dropped connection is closed first.
+
+        Returns:
+            True if connection successful
+        """
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            await self._close_socket()
+
+            try:
+                self._ws = await asyncio.wait_for(
+                    websockets.connect(self.url, **self.ws_options),
+                    timeout=10.0
+                )
+
+                # websockets >= 14 can send UTF-8 bytes as a text frame as-is;
+                # older versions need a str (bytes would go out as a binary frame)
+                self._ws_text_bytes = "text" in inspect.signature(self._ws.send).parameters
+
+                # Wait for challenge
+                challenge_msg = await asyncio.wait_for(self._ws.recv(), timeout=5.0)
+                challenge = _json_loads(challenge_msg)
+
+                if challenge.get("type") == "event" and challenge.get("event") == "connect.challenge":
+                    # Send connect request with admin scope (required for chat.send)
+                    connect_req = (
+                        self._CONNECT_PREFIX + _json_dumpb(_next_id())
+                        + b',"params":' + self._connect_params + b"}"
+                    )
+
+                    await self._send_raw(connect_req)
+
+                    # Wait for connect response
+                    response_msg = await asyncio.wait_for(self._ws.recv(), timeout=5.0)
+                    response = _json_loads(response_msg)
+
+                    if response.get("type") == "res" and response.get("ok"):
+                        self.connected = True
+                        # Start background receiver task
+                        self._receiver_task = asyncio.create_task(self._receive_messages())
+                        return True
+                    else:
+                        error = response.get("error", response)
+                        logger.warning("Connect failed: %s", error)
+                        return False
+
+            except asyncio.TimeoutError:
+                logger.warning("Connection timeout")
+                return False
+            except Exception as e:
+                logger.warning("Connection error: %s", e)
+                return False
+
+    async def send_frame(self, frame: bytes) -> None:
+        """
+        Send a request frame on the authenticated connection.
+
+        Raises:
+            ConnectionError: If the connection is down or mid-handshake
+                (retryable: chat() reconnects and tries again)
+        """
+        if not self.connected or self._ws is None:
+            raise ConnectionError("Gateway connection is not ready")
+        await self._send_raw(frame)
+
+    async def _send_raw(self, frame: bytes) -> None:
+        """Send a UTF-8 JSON frame to the gateway as a text frame."""
+        if self._ws_text_bytes:
+            await self._ws.send(frame, text=True)
+        else:
+            await self._ws.send(frame.decode("utf-8"))
+
+    async def _receive_messages(self):
+        """Background task that receives messages and routes them to pending requests."""
+        # Routing tables are only ever mutated in place, so bind them once
+        pending_requests = self.pending_requests
+        by_run_id = self.by_run_id
+        by_session_key = self.by_session_key
+        deliver = self._deliver
+        ws = self._ws
+
+        try:
+            while self.connected:
+                try:
+                    msg = await ws.recv()
+                except Exception as e:
+                    # The socket is gone (closed, or the transport failed):
+                    # fail in-flight requests now so chat() can retry
+                    # instead of waiting out its timeout
+                    if self.connected:
+                        self.connected = False
+                        if isinstance(e, websockets.ConnectionClosed):
+                            reason = f"Gateway connection closed: {e}"
+                        else:
+                            reason = f"Gateway receive failed: {type(e).__name__}: {e}"
+                        logger.warning("%s", reason)
+                        self._fail_pending(reason)
+                    break
+
+                # Consumers only act on "res" frames and "final" chat
+                # events; skip parsing the streamed frames in between.
+                # Both tokens can only appear unescaped as JSON keys or
+                # values, so any frame that might matter is still parsed.
+                if isinstance(msg, str) and '"final"' not in msg and '"res"' not in msg:
+                    continue
+
+                # A malformed frame only affects itself, never the receiver
+                try:
+                    data = _json_loads(msg)
+                    msg_type = data.get("type")
+
+                    # Route message based on request ID
+                    request_info = pending_requests.get(data.get("id"))
+                    if request_info is not None:
+                        deliver(request_info, data)
+
+                        # Store runId if this is the initial response
+                        if msg_type == "res" and data.get("ok"):
+                            run_id = data.get("payload", {}).get("runId")
+                            if run_id:
+                                request_info.run_id = run_id
+                                by_run_id[run_id] = request_info
+
+                    elif msg_type == "event":
+                        payload = data.get("payload", {})
+                        run_id = payload.get("runId")
+                        session_key = payload.get("sessionKey")
+
+                        # Route event to the request that matches runId,
+                        # falling back to sessionKey (unique per in-flight request)
+                        if run_id:
+                            request_info = by_run_id.get(run_id)
+                        if request_info is None and session_key:
+                            request_info = by_session_key.get(session_key)
+                        if request_info is not None:
+                            deliver(request_info, data)
+
+                except (ValueError, KeyError, AttributeError, TypeError) as e:
+                    # ValueError covers json/orjson JSONDecodeError
+                    logger.warning("Receiver error (frame skipped): %s", e)
+        except asyncio.CancelledError:
+            pass
+
+    def _fail_pending(self, reason: str) -> None:
+        """Wake every in-flight request with a ConnectionError."""
+        for request_info in self.pending_requests.values():
+            request_info.error = ConnectionError(reason)
+            waiter = request_info.waiter
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+
+    @staticmethod
+    def _deliver(request_info: _ReqState, data: Dict[str, Any]) -> None:
+        """Append a frame to a request's inbox and wake its consumer if it is waiting."""
+        request_info.deque.append(data)
+        waiter = request_info.waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def socket_open(self) -> bool:
+        """Whether the WebSocket is still open and its receiver is running."""
+        ws = self._ws
+        task = self._receiver_task
+        return (
+            ws is not None
+            and getattr(ws.state, "name", None) == "OPEN"
+            and task is not None
+            and not task.done()
+        )
+
+    async def _close_socket(self) -> None:
+        """Fail in-flight requests, then stop the receiver and close the WebSocket, if any."""
+        self.connected = False
+
+        # Requests sent on this socket can no longer be answered; wake them
+        # with a retryable error rather than leaving them to time out
+        if self.pending_requests:
+            self._fail_pending("Gateway connection reset")
+
+        # Cancel receiver task
+        if self._receiver_task:
+            self._receiver_task.cancel()
+            try:
+                await self._receiver_task
+            except asyncio.CancelledError:
+                pass
+            self._receiver_task = None
+
+        if self._ws:
+            await self._ws.close()
+            self._ws = None
+
+    async def close(self) -> None:
+        """Close the connection and forget all pending requests."""
+        await self._close_socket()
+
+        # Clear pending requests
+        self.pending_requests.clear()
+        self.by_run_id.clear()
+        self.by_session_key.clear()
+
+
+# Live gateway connections, keyed by (url, token)
+_SHARED_CONNECTIONS: Dict[Tuple[str, str], _MoltbotConnection] = {}
+
+# Connector session numbers. Module-wide rather than per client, since
+# clients sharing a connection also share its session-key routing table
+_session_counter = itertools.count(1)
+
+
 class MoltbotClient:
     """WebSocket client for Moltbot using chat.send method with session pooling for parallel requests."""
 
+    __slots__ = (
+        "url",
+        "token",
+        "timeout",
+        "pool_size",
+        "_ws_options",
+        "_conn",
+        "_admission_cond",
+        "_admission_active",
+        "_cleanup_queue",
+        "_cleanup_task",
+        "_agent_snapshot",
+        "_sessions_lock",
+    )
+
     CONNECTOR_SESSION_PREFIX = "agent:main:agentwatch-connector"
     SESSIONS_FILE, SESSIONS_DIR = _detect_framework_paths()
 
-    def __init__(self, url: str, token: str, timeout: float = 120.0, pool_size: int = 5):
+    # websockets.connect() options tuned for a single consumer draining a
+    # stream of small JSON frames: no client-side receive backpressure
+    # (frames go straight into per-request inboxes), room for long final
+    # responses, and keepalive pings to detect dead peers. Per-message
+    # deflate is off here and only enabled for non-loopback gateways
+    # (see _default_ws_options), where bytes on the wire cost more than CPU.
+    WS_CONNECT_OPTIONS: Dict[str, Any] = {
+        "max_queue": None,
+        "max_size": 16 * 2 ** 20,
+        "write_limit": 2 ** 20,
+        "compression": None,
+        "ping_interval": 20,
+        "ping_timeout": 20,
+    }
+
+    # Session cleanup batching: up to CLEANUP_BATCH_SIZE sessions are
+    # removed together, gathered over CLEANUP_INTERVAL seconds
+    CLEANUP_BATCH_SIZE = 32
+    CLEANUP_INTERVAL = 0.25
+
+    # Static head of every chat.send frame; only id and params vary per request
+    _CHAT_SEND_PREFIX = b'{"type":"req","method":"chat.send","id":'
+
+    # Parsed sessions.json shared by all clients, re-read only when the file
+    # changes on disk (mtime_ns, size). Accessed from worker threads, so
+    # guarded by a threading lock rather than an asyncio one.
+    _sessions_index: Dict[str, Any] = {}
+    _sessions_stamp: Optional[Tuple[int, int]] = None
+    _sessions_index_lock = threading.Lock()
+
+    # Last captured agent snapshot, keyed by (sessions file, stamp)
+    _agent_snapshot_cache: Optional[Tuple[Tuple[Path, Tuple[int, int]], _AgentSnapshot]] = None
+
+    # Errors that indicate a dropped/restarting gateway connection
+    _RETRYABLE_TYPES = (websockets.ConnectionClosed, asyncio.TimeoutError, ConnectionError)
+    _RETRY_NEEDLES = ("connection", "restart", "closed", "keepalive", "ping timeout", "1011")
+    _RETRYABLE = re.compile("|".join(map(re.escape, _RETRY_NEEDLES)), re.IGNORECASE)
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        timeout: float = 120.0,
+        pool_size: int = 5,
+        ws_options: Optional[Dict[str, Any]] = None,
+    ):
         """
         Initialize the Moltbot client with session pooling.
 
@@ -62,6 +530,7 @@ class MoltbotClient:
             token: The gateway authentication token
             timeout: Request timeout in seconds
             pool_size: Number of sessions in the pool for parallel requests
+            ws_options: Overrides for websockets.connect() (see WS_CONNECT_OPTIONS)
         """
         # Normalize URL to ws://
         if url.startswith("http://"):
@@ -75,411 +544,523 @@ class MoltbotClient:
         self.token = token
         self.timeout = timeout
         self.pool_size = pool_size
-        self._ws: Optional[WebSocketClientProtocol] = None
-        self._connected = False
+        self._ws_options = {**self._default_ws_options(self.url), **(ws_options or {})}
+        # Gateway connection shared with other clients (attached on connect)
+        self._conn: Optional[_MoltbotConnection] = None
 
-        # Session slots: limit concurrency without reusing sessions
-        self._session_semaphore: Optional[asyncio.Semaphore] = None
-        self._session_counter = 0
+        # Session slots: limit concurrency without reusing sessions.
+        # A condition-guarded counter (rather than a semaphore) lets
+        # set_pool_size() resize the limit at runtime.
+        self._admission_cond = asyncio.Condition()
+        self._admission_active = 0
 
-        # Message routing for parallel requests
-        self._pending_requests: Dict[str, asyncio.Queue] = {}
-        self._receiver_task: Optional[asyncio.Task] = None
-        self._receiver_lock = asyncio.Lock()
+        # Used sessions awaiting removal (see _cleanup_loop)
+        self._cleanup_queue: asyncio.Queue = asyncio.Queue()
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+        # Serializes this client's sessions.json updates on the event loop
+        self._sessions_lock = asyncio.Lock()
 
         # Detect and log framework version
-        framework_name = "OpenClaw" if ".openclaw" in str(self.SESSIONS_FILE) else "Clawdbot (legacy)"
-        print(f"Detected framework: {framework_name}")
-        print(f"Session path: {self.SESSIONS_DIR}")
+        if logger.isEnabledFor(logging.DEBUG):
+            framework_name = "OpenClaw" if ".openclaw" in str(self.SESSIONS_FILE) else "Clawdbot (legacy)"
+            logger.debug("Detected framework: %s", framework_name)
+            logger.debug("Session path: %s", self.SESSIONS_DIR)
+
+        # Snapshot agent state for consistent evaluation (captured on first request)
+        self._agent_snapshot: Optional[_AgentSnapshot] = None
 
-        # Snapshot agent state for consistent evaluation
-        self._agent_snapshot = self._capture_agent_snapshot()
+        logger.debug("Session concurrency limit: %d", pool_size)
+
+    @classmethod
+    def _default_ws_options(cls, url: str) -> Dict[str, Any]:
+        """Return WS_CONNECT_OPTIONS, with deflate enabled unless the gateway is local."""
+        host = urlsplit(url).hostname or ""
+        try:
+            is_local = host == "localhost" or ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            is_local = False
 
-        # Initialize session semaphore for concurrency control
-        self._session_semaphore = asyncio.Semaphore(pool_size)
-        print(f"Session concurrency limit: {pool_size}")
+        if is_local:
+            return dict(cls.WS_CONNECT_OPTIONS)
+        return {**cls.WS_CONNECT_OPTIONS, "compression": "deflate"}
+
+    @property
+    def _connected(self) -> bool:
+        """Whether this client is attached to a live, authenticated connection."""
+        return self._conn is not None and self._conn.connected
 
     async def connect(self) -> bool:
         """
-        Connect to the gateway and complete handshake.
+        Attach to the shared gateway connection, connecting if needed.
 
         Returns:
             True if connection successful
         """
+        if self._conn is None:
+            self._conn = _MoltbotConnection.acquire(self.url, self.token, self._ws_options)
+        return await self._conn.connect()
+
+    @classmethod
+    def _capture_agent_snapshot(cls) -> _AgentSnapshot:
+        """
+        Capture a snapshot of the main agent's state for consistent evaluation.
+
+        The snapshot is cached on the class and shared by all clients until
+        sessions.json changes on disk.
+        """
         try:
-            self._ws = await asyncio.wait_for(
-                websockets.connect(self.url),
-                timeout=10.0
+            with cls._sessions_index_lock:
+                sessions = cls._load_sessions()
+                stamp = cls._sessions_stamp
+
+            if stamp is None:
+                logger.warning("Sessions file not found at %s", cls.SESSIONS_FILE)
+                return _AgentSnapshot()
+
+            cache_key = (cls.SESSIONS_FILE, stamp)
+            cached = cls._agent_snapshot_cache
+            if cached is not None and cached[0] == cache_key:
+                return cached[1]
+
+            # Get the main session as template
+            main_session = sessions.get("agent:main:main", {})
+
+            # Extract snapshot fields (these define agent state)
+            snapshot = _AgentSnapshot(
+                skills_snapshot=main_session.get("skillsSnapshot"),
+                system_prompt_report=main_session.get("systemPromptReport"),
+                model_provider=main_session.get("modelProvider", "anthropic"),
+                model=main_session.get("model", "claude-opus-4-5"),
+                context_tokens=main_session.get("contextTokens", 200000),
+                auth_profile_override=main_session.get("authProfileOverride"),
+                auth_profile_override_source=main_session.get("authProfileOverrideSource"),
             )
 
-            # Wait for challenge
-            challenge_msg = await asyncio.wait_for(self._ws.recv(), timeout=5.0)
-            challenge = json.loads(challenge_msg)
-
-            if challenge.get("type") == "event" and challenge.get("event") == "connect.challenge":
-                # Send connect request with admin scope (required for chat.send)
-                connect_req = {
-                    "type": "req",
-                    "id": str(uuid.uuid4()),
-                    "method": "connect",
-                    "params": {
-                        "minProtocol": 3,
-                        "maxProtocol": 3,
-                        "client": {
-                            "id": "gateway-client",
-                            "mode": "backend",
-                            "version": "0.1.0",
-                            "platform": "python"
-                        },
-                        "role": "operator",
-                        "scopes": ["operator.read", "operator.write", "operator.admin"],
-                        "auth": {"token": self.token}
-                    }
-                }
-
-                await self._ws.send(json.dumps(connect_req))
-
-                # Wait for connect response
-                response_msg = await asyncio.wait_for(self._ws.recv(), timeout=5.0)
-                response = json.loads(response_msg)
-
-                if response.get("type") == "res" and response.get("ok"):
-                    self._connected = True
-                    # Start background receiver task
-                    self._receiver_task = asyncio.create_task(self._receive_messages())
-                    return True
-                else:
-                    error = response.get("error", response)
-                    print(f"Connect failed: {error}")
-                    return False
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Captured agent snapshot from main session")
+                if snapshot.skills_snapshot:
+                    skill_count = len(snapshot.skills_snapshot.get("skills", []))
+                    logger.debug("  Skills: %d", skill_count)
+                if snapshot.system_prompt_report:
+                    file_count = len(snapshot.system_prompt_report.get("injectedWorkspaceFiles", []))
+                    logger.debug("  Workspace files: %d", file_count)
 
-        except asyncio.TimeoutError:
-            print("Connection timeout")
-            return False
-        except Exception as e:
-            print(f"Connection error: {e}")
-            return False
+            cls._agent_snapshot_cache = (cache_key, snapshot)
+            return snapshot
 
-    async def _receive_messages(self):
-        """Background task that receives messages and routes them to pending requests."""
-        try:
-            while self._connected and self._ws:
-                try:
-                    msg = await self._ws.recv()
-                    data = json.loads(msg)
+        except Exception as e:
+            logger.warning("Failed to capture agent snapshot: %s", e)
+            return _AgentSnapshot()
 
-                    # Route message based on request ID
-                    req_id = data.get("id")
-                    if req_id and req_id in self._pending_requests:
-                        request_info = self._pending_requests[req_id]
-                        await request_info["queue"].put(data)
+    @classmethod
+    def _load_sessions(cls) -> Dict[str, Any]:
+        """
+        Return the shared sessions index, re-reading sessions.json only
+        when it changed on disk (e.g. the gateway updated another session).
 
-                        # Store runId if this is the initial response
-                        if data.get("type") == "res" and data.get("ok"):
-                            run_id = data.get("payload", {}).get("runId")
-                            if run_id:
-                                request_info["run_id"] = run_id
+        Callers must hold _sessions_index_lock.
+        """
+        try:
+            st = cls.SESSIONS_FILE.stat()
+        except FileNotFoundError:
+            cls._sessions_index = {}
+            cls._sessions_stamp = None
+            return cls._sessions_index
+
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != cls._sessions_stamp:
+            with open(cls.SESSIONS_FILE, 'rb') as f:
+                cls._sessions_index = _json_loads(f.read())
+            cls._sessions_stamp = stamp
+        return cls._sessions_index
+
+    @classmethod
+    def _save_sessions(cls) -> None:
+        """
+        Persist the shared sessions index to sessions.json.
 
-                    elif data.get("type") == "event":
-                        payload = data.get("payload", {})
-                        run_id = payload.get("runId")
-                        session_key = payload.get("sessionKey")
+        Callers must hold _sessions_index_lock.
+        """
+        replace_file(cls.SESSIONS_FILE, _dump_sessions(cls._sessions_index))
+        st = cls.SESSIONS_FILE.stat()
+        cls._sessions_stamp = (st.st_mtime_ns, st.st_size)
 
-                        # Route event to the request that matches runId or sessionKey
-                        for req_id, request_info in list(self._pending_requests.items()):
-                            if run_id and request_info["run_id"] == run_id:
-                                try:
-                                    request_info["queue"].put_nowait(data)
-                                except asyncio.QueueFull:
-                                    pass
-                                break
-                            elif session_key and request_info["session_key"] == session_key and not run_id:
-                                # Fallback to sessionKey matching for events without runId
-                                try:
-                                    request_info["queue"].put_nowait(data)
-                                except asyncio.QueueFull:
-                                    pass
-                                break
+    def _put_session_entry(self, session_key: str, session_data: Dict[str, Any]) -> None:
+        """Add a session to sessions.json (blocking; run in a worker thread)."""
+        with self._sessions_index_lock:
+            try:
+                self._load_sessions()[session_key] = session_data
+                self._save_sessions()
+            except Exception:
+                # Force a re-read next time so memory matches disk again
+                type(self)._sessions_stamp = None
+                raise
 
-                except Exception as e:
-                    if self._connected:
-                        print(f"Receiver error: {e}")
-                    break
-        except asyncio.CancelledError:
-            pass
+    def _pop_session_entries(self, session_keys: List[str]) -> None:
+        """Remove sessions from sessions.json in one rewrite (blocking; run in a worker thread)."""
+        with self._sessions_index_lock:
+            try:
+                sessions = self._load_sessions()
+                removed = False
+                for session_key in session_keys:
+                    if sessions.pop(session_key, None) is not None:
+                        removed = True
+                if removed:
+                    self._save_sessions()
+            except Exception:
+                type(self)._sessions_stamp = None
+                raise
 
-    def _capture_agent_snapshot(self) -> Dict:
-        """Capture a snapshot of the main agent's state for consistent evaluation."""
-        if not self.SESSIONS_FILE.exists():
-            print(f"Warning: Sessions file not found at {self.SESSIONS_FILE}")
-            return {}
+    def _register_session(self) -> Tuple[str, str]:
+        """Allocate the key and id of a fresh session (in memory, no I/O)."""
+        session_id = str(uuid.uuid4())
+        session_key = f"{self.CONNECTOR_SESSION_PREFIX}-{next(_session_counter)}"
+        return (session_key, session_id)
 
-        try:
-            with open(self.SESSIONS_FILE, 'r') as f:
-                sessions = json.load(f)
+    async def _persist_session(self, session_key: str, session_id: str) -> None:
+        """
+        Write a session's sessions.json entry and transcript header.
 
-            # Get the main session as template
-            main_session = sessions.get("agent:main:main", {})
+        The two files are independent, so both writes run concurrently.
+        """
+        now_ms = time.time_ns() // 1_000_000
+
+        # Create session data with snapshot
+        snap = self._agent_snapshot
+        session_data = {
+            "sessionId": session_id,
+            "type": "embedded",
+            "createdAt": now_ms,
+            "updatedAt": now_ms,
+            "modelProvider": snap.model_provider,
+            "model": snap.model,
+            "contextTokens": snap.context_tokens,
+        }
 
-            # Extract snapshot fields (these define agent state)
-            snapshot = {
-                "skillsSnapshot": main_session.get("skillsSnapshot"),
-                "systemPromptReport": main_session.get("systemPromptReport"),
-                "modelProvider": main_session.get("modelProvider", "anthropic"),
-                "model": main_session.get("model", "claude-opus-4-5"),
-                "contextTokens": main_session.get("contextTokens", 200000),
-                "authProfileOverride": main_session.get("authProfileOverride"),
-                "authProfileOverrideSource": main_session.get("authProfileOverrideSource"),
-            }
-
-            print(f"Captured agent snapshot from main session")
-            if snapshot.get("skillsSnapshot"):
-                skill_count = len(snapshot["skillsSnapshot"].get("skills", []))
-                print(f"  Skills: {skill_count}")
-            if snapshot.get("systemPromptReport"):
-                file_count = len(snapshot["systemPromptReport"].get("injectedWorkspaceFiles", []))
-                print(f"  Workspace files: {file_count}")
+        # Add snapshot metadata if available
+        if snap.skills_snapshot:
+            session_data["skillsSnapshot"] = snap.skills_snapshot
+        if snap.system_prompt_report:
+            session_data["systemPromptReport"] = snap.system_prompt_report
+        if snap.auth_profile_override:
+            session_data["authProfileOverride"] = snap.auth_profile_override
+            session_data["authProfileOverrideSource"] = snap.auth_profile_override_source
+
+        # Create session file
+        session_file = self.SESSIONS_DIR / f"{session_id}.jsonl"
+
+        # Use detected framework base for workspace path
+        framework_base = self.SESSIONS_DIR.parent.parent.parent  # Go up from sessions to framework root
+        session_header = {
+            "type": "session",
+            "version": 3,
+            "id": session_id,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now_ms // 1000)) + f".{now_ms % 1000:03d}Z",
+            "cwd": str(framework_base / "workspace")
+        }
+        line = _json_dumpb(session_header) + b"\n"
 
-            return snapshot
+        async def register() -> None:
+            # Register session in sessions.json
+            async with self._sessions_lock:
+                await asyncio.to_thread(self._put_session_entry, session_key, session_data)
 
-        except Exception as e:
-            print(f"Warning: Failed to capture agent snapshot: {e}")
-            return {}
+        await asyncio.gather(register(), asyncio.to_thread(write_file, session_file, line))
 
-    def _create_fresh_session(self) -> tuple[str, str]:
+    async def _create_fresh_session(self) -> tuple[str, str]:
         """Create a fresh session for a request."""
-        import uuid
-        from datetime import datetime
+        # Snapshot agent state on first use (reads sessions.json off the event loop)
+        if self._agent_snapshot is None:
+            async with self._sessions_lock:
+                if self._agent_snapshot is None:
+                    self._agent_snapshot = await asyncio.to_thread(self._capture_agent_snapshot)
 
-        # Generate unique session ID
-        session_id = str(uuid.uuid4())
-        self._session_counter += 1
-        session_key = f"{self.CONNECTOR_SESSION_PREFIX}-{self._session_counter}"
+        session_key, session_id = self._register_session()
 
+        # The gateway resolves sessionKey through sessions.json, so the
+        # session must be on disk before chat.send goes out
         try:
-            # Create session in sessions.json
-            if self.SESSIONS_FILE.exists():
-                with open(self.SESSIONS_FILE, 'r') as f:
-                    sessions = json.load(f)
-            else:
-                sessions = {}
-
-            # Create session data with snapshot
-            session_data = {
-                "sessionId": session_id,
-                "type": "embedded",
-                "createdAt": int(time.time() * 1000),
-                "updatedAt": int(time.time() * 1000),
-                "modelProvider": self._agent_snapshot.get("modelProvider", "anthropic"),
-                "model": self._agent_snapshot.get("model", "claude-opus-4-5"),
-                "contextTokens": self._agent_snapshot.get("contextTokens", 200000),
-            }
-
-            # Add snapshot metadata if available
-            if self._agent_snapshot.get("skillsSnapshot"):
-                session_data["skillsSnapshot"] = self._agent_snapshot["skillsSnapshot"]
-            if self._agent_snapshot.get("systemPromptReport"):
-                session_data["systemPromptReport"] = self._agent_snapshot["systemPromptReport"]
-            if self._agent_snapshot.get("authProfileOverride"):
-                session_data["authProfileOverride"] = self._agent_snapshot["authProfileOverride"]
-                session_data["authProfileOverrideSource"] = self._agent_snapshot.get("authProfileOverrideSource", "auto")
-
-            sessions[session_key] = session_data
-
-            # Write sessions.json
-            with open(self.SESSIONS_FILE, 'w') as f:
-                json.dump(sessions, f, indent=2)
-
-            # Create session file
-            session_file = self.SESSIONS_DIR / f"{session_id}.jsonl"
-
-            # Use detected framework base for workspace path
-            framework_base = self.SESSIONS_DIR.parent.parent.parent  # Go up from sessions to framework root
-            session_header = {
-                "type": "session",
-                "version": 3,
-                "id": session_id,
-                "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
-                "cwd": str(framework_base / "workspace")
-            }
-            with open(session_file, 'w') as f:
-                f.write(json.dumps(session_header) + "\n")
-
-            return (session_key, session_id)
-
+            await self._persist_session(session_key, session_id)
         except Exception as e:
-            print(f"Warning: Failed to create fresh session: {e}")
+            logger.warning("Failed to create fresh session: %s", e)
             # Fallback to basic session
-            return (session_key, session_id)
 
-    def _cleanup_session(self, session_key: str, session_id: str) -> None:
-        """Clean up a session after use."""
+        return (session_key, session_id)
+
+    def _schedule_cleanup(self, session_key: str, session_id: str) -> None:
+        """Queue a used session for removal by the background cleanup task."""
+        self._cleanup_queue.put_nowait((session_key, session_id))
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def _cleanup_loop(self) -> None:
+        """Background task that removes used sessions in batches."""
+        queue = self._cleanup_queue
+        while True:
+            batch = [await queue.get()]
+
+            # Let requests finishing around the same time share one rewrite
+            await asyncio.sleep(self.CLEANUP_INTERVAL)
+            while len(batch) < self.CLEANUP_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self._cleanup_sessions(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _unlink_session_files(self, session_ids: List[str]) -> None:
+        """Delete session transcript files (blocking; run in a worker thread)."""
+        for session_id in session_ids:
+            (self.SESSIONS_DIR / f"{session_id}.jsonl").unlink(missing_ok=True)
+
+    async def _cleanup_sessions(self, batch: List[Tuple[str, str]]) -> None:
+        """Clean up a batch of (session_key, session_id) pairs after use."""
         try:
-            # Delete session file
-            session_file = self.SESSIONS_DIR / f"{session_id}.jsonl"
-            if session_file.exists():
-                session_file.unlink()
+            # Delete session files
+            await asyncio.to_thread(self._unlink_session_files, [session_id for _, session_id in batch])
 
             # Remove from sessions.json
-            if self.SESSIONS_FILE.exists():
-                with open(self.SESSIONS_FILE, 'r') as f:
-                    sessions = json.load(f)
-
-                if session_key in sessions:
-                    del sessions[session_key]
-                    with open(self.SESSIONS_FILE, 'w') as f:
-                        json.dump(sessions, f, indent=2)
+            async with self._sessions_lock:
+                await asyncio.to_thread(self._pop_session_entries, [session_key for session_key, _ in batch])
 
         except Exception as e:
-            print(f"Warning: Failed to clean up session: {e}")
+            logger.warning("Failed to clean up sessions: %s", e)
+
+    async def _acquire_slot(self) -> None:
+        """Wait until fewer than pool_size requests are in flight, then claim a slot."""
+        cond = self._admission_cond
+        async with cond:
+            try:
+                await cond.wait_for(lambda: self._admission_active < self.pool_size)
+            except asyncio.CancelledError:
+                # Before Python 3.13 a waiter cancelled right after being
+                # notified swallows the wakeup; pass it on to the next one
+                if self._admission_active < self.pool_size:
+                    cond.notify(1)
+                raise
+            self._admission_active += 1
+
+    async def _release_slot(self) -> None:
+        """Release a slot claimed by _acquire_slot and wake one waiter."""
+        # Free the slot before any await so cancellation cannot leak it,
+        # and shield the wakeup so it still happens if the caller is cancelled
+        self._admission_active -= 1
+        await asyncio.shield(self._notify_admission())
+
+    async def _notify_admission(self) -> None:
+        """Wake one request waiting in _acquire_slot."""
+        async with self._admission_cond:
+            self._admission_cond.notify(1)
+
+    async def set_pool_size(self, pool_size: int) -> None:
+        """
+        Change the number of concurrent chat requests at runtime.
+
+        Shrinking takes effect as in-flight requests finish; growing
+        admits waiting requests immediately.
+
+        Args:
+            pool_size: New concurrency limit (must be at least 1)
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        async with self._admission_cond:
+            grew = pool_size > self.pool_size
+            self.pool_size = pool_size
+            if grew:
+                self._admission_cond.notify_all()
 
     async def chat(
         self,
         messages: List[Dict[str, str]],
-        temperature: float = 0.7,
-        max_tokens: int = 4000,
-        model: str = "openclaw",
+        *,
         max_retries: int = 3,
+        **_ignored: Any,
     ) -> str:
         """
         Send a chat request to Moltbot with automatic reconnection.
 
         Args:
             messages: List of message dicts with 'role' and 'content' keys
-            temperature: Generation temperature (ignored - uses Moltbot defaults)
-            max_tokens: Maximum tokens (ignored - uses Moltbot defaults)
-            model: Model name (ignored - uses Moltbot configured model)
             max_retries: Maximum number of retry attempts on connection errors
+            **_ignored: Accepted for compatibility and ignored: temperature,
+                max_tokens and model (Moltbot uses its configured model and defaults)
 
         Returns:
             The assistant's response text
         """
         last_error = None
+        attempts = 0
+
+        # Decorrelated jitter: spreads retries of parallel callers instead of
+        # having them all hit a restarting gateway at the same instants.
+        # The whole retry sequence is bounded by the request timeout.
+        prev_sleep = 1.0
+        deadline = time.monotonic() + self.timeout
 
         for attempt in range(max_retries):
+            attempts = attempt + 1
             try:
                 # Connect if not already connected
                 if not self._connected:
                     connected = await self.connect()
                     if not connected:
+                        last_error = Exception("Failed to connect to Moltbot")
                         if attempt < max_retries - 1:
-                            await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                            prev_sleep = random.uniform(0.1, min(prev_sleep * 3, 10.0))
+                            if time.monotonic() + prev_sleep >= deadline:
+                                break
+                            await asyncio.sleep(prev_sleep)
                             continue
                         raise Exception("Failed to connect to Moltbot")
 
-                # Acquire slot from semaphore (limits concurrency)
-                async with self._session_semaphore:
+                # Acquire a session slot (limits concurrency)
+                await self._acquire_slot()
+                try:
                     # Create fresh session for this request
-                    session_key, session_id = self._create_fresh_session()
+                    session_key, session_id = await self._create_fresh_session()
 
                     try:
                         response = await self._send_chat_request(messages, session_key, session_id)
                         return response
                     finally:
-                        # Clean up session after use
-                        self._cleanup_session(session_key, session_id)
+                        # Clean up session after use (off the response path)
+                        self._schedule_cleanup(session_key, session_id)
+                finally:
+                    await self._release_slot()
 
             except Exception as e:
                 last_error = e
-                error_str = str(e).lower()
 
-                # Check if it's a retryable error
-                is_connection_error = any(x in error_str for x in ["connection", "restart", "closed", "keepalive", "ping timeout", "1011"])
-                is_empty_response = "empty response" in error_str
+                # Check if it's a retryable error (type check first, message scan as fallback)
+                if isinstance(e, self._RETRYABLE_TYPES):
+                    is_connection_error = True
+                    is_empty_response = False
+                else:
+                    error_str = str(e)
+                    is_connection_error = self._RETRYABLE.search(error_str) is not None
+                    is_empty_response = "empty response" in error_str
 
                 if is_connection_error or is_empty_response:
                     if attempt < max_retries - 1:
-                        if is_connection_error:
-                            # Reset connection state for connection errors
-                            self._connected = False
+                        if (is_connection_error and self._conn is not None
+                                and not self._conn.socket_open()):
+                            # The shared socket is really gone: force a reconnect.
+                            # A healthy socket is left alone, since other
+                            # clients' requests are in flight on it.
+                            self._conn.connected = False
                         if is_empty_response:
-                            print(f"Warning: Empty response on attempt {attempt + 1}, retrying...")
-                        await asyncio.sleep(2 ** attempt)
+                            logger.warning("Empty response on attempt %d, retrying...", attempt + 1)
+                        prev_sleep = random.uniform(0.1, min(prev_sleep * 3, 10.0))
+                        if time.monotonic() + prev_sleep >= deadline:
+                            break
+                        await asyncio.sleep(prev_sleep)
                         continue
 
                 # Not a retryable error, raise immediately
                 raise
 
-        # All retries exhausted
-        raise Exception(f"Failed after {max_retries} attempts: {last_error}")
+        # All retries exhausted (or retry budget spent)
+        raise Exception(f"Failed after {attempts} attempts: {last_error}")
 
     async def _send_chat_request(self, messages: List[Dict[str, str]], session_key: str, session_id: str) -> str:
         """Internal method to send chat request without retry logic."""
 
-        # Extract user message (last user message)
+        # Extract user message (last user message); usually it is the final entry
         user_message = None
-        for msg in reversed(messages):
-            if msg.get("role") == "user":
-                user_message = msg.get("content")
-                break
+        last = messages[-1] if messages else None
+        if last is not None and last.get("role") == "user":
+            user_message = last.get("content")
+        else:
+            for msg in reversed(messages):
+                if msg.get("role") == "user":
+                    user_message = msg.get("content")
+                    break
 
         if not user_message:
             raise Exception("No user message found")
 
-        # Send chat.send request
-        req_id = str(uuid.uuid4())
-        request = {
-            "type": "req",
-            "id": req_id,
-            "method": "chat.send",
-            "params": {
-                "sessionKey": session_key,
-                "message": user_message,
-                "idempotencyKey": str(uuid.uuid4())
-            }
+        # Send chat.send request (static envelope + serialized variable fields)
+        req_id = _next_id()
+        params = {
+            "sessionKey": session_key,
+            "message": user_message,
+            "idempotencyKey": _next_id()
         }
+        frame = self._CHAT_SEND_PREFIX + _json_dumpb(req_id) + b',"params":' + _json_dumpb(params) + b"}"
 
-        # Create queue for this request, store with both req_id and session_key
-        message_queue = asyncio.Queue(maxsize=100)
-        self._pending_requests[req_id] = {
-            "queue": message_queue,
-            "session_key": session_key,
-            "run_id": None
-        }
+        # Create inbox for this request, indexed by req_id and session_key
+        # (and by run_id once the gateway acknowledges the request)
+        request_info = _ReqState(session_key)
+        conn = self._conn
+        conn.pending_requests[req_id] = request_info
+        conn.by_session_key[session_key] = request_info
 
         try:
-            await self._ws.send(json.dumps(request))
+            await conn.send_frame(frame)
 
             # Wait for initial response and events
             initial_response_received = False
-            response_content = []
-            timeout_start = asyncio.get_event_loop().time()
-            request_info = self._pending_requests[req_id]
-
-            while True:
-                try:
-                    # Calculate remaining timeout
-                    elapsed = asyncio.get_event_loop().time() - timeout_start
-                    remaining_timeout = self.timeout - elapsed
-                    if remaining_timeout <= 0:
-                        raise asyncio.TimeoutError()
-
-                    data = await asyncio.wait_for(request_info["queue"].get(), timeout=remaining_timeout)
-
-                    if data.get("type") == "res" and data.get("id") == req_id:
-                        if not data.get("ok"):
-                            raise Exception(f"chat.send failed: {data.get('error')}")
-                        initial_response_received = True
-                        # Continue to collect turn events
-
-                    elif data.get("type") == "event":
-                        event = data.get("event", "")
-                        payload = data.get("payload", {})
-
-                        # Response is in chat events with message.content[].text structure
-                        # Only collect from the final state to avoid duplicates
-                        if event == "chat" and payload.get("state") == "final":
-                            message = payload.get("message", {})
-                            content_blocks = message.get("content", [])
-                            for block in content_blocks:
-                                if block.get("type") == "text" and block.get("text"):
-                                    response_content.append(block["text"])
-                            break
-
-                except asyncio.TimeoutError:
-                    # If we got some content, return it
-                    if response_content:
-                        break
+            response = ""
+
+            async def collect() -> None:
+                nonlocal initial_response_received, response
+                pending = request_info.deque
+                popleft = pending.popleft
+                create_future = asyncio.get_running_loop().create_future
+                while True:
+                    # Sleep until the receiver hands us at least one frame
+                    # (no clock reads here: the turn deadline is one wait_for)
+                    while not pending:
+                        if request_info.error is not None:
+                            raise request_info.error
+                        waiter = create_future()
+                        request_info.waiter = waiter
+                        try:
+                            await waiter
+                        finally:
+                            request_info.waiter = None
+
+                    # Drain everything that arrived in one pass
+                    while pending:
+                        data = popleft()
+                        msg_type = data.get("type")
+
+                        if msg_type == "event":
+                            # Response is in chat events with message.content[].text structure
+                            # Only collect from the final state to avoid duplicates
+                            if data.get("event") != "chat":
+                                continue
+                            payload = data.get("payload", {})
+                            if payload.get("state") != "final":
+                                continue
+
+                            content_blocks = payload.get("message", {}).get("content", [])
+                            # A list, not a generator: str.join would
+                            # materialize one first anyway
+                            response = "".join([
+                                block["text"]
+                                for block in content_blocks
+                                if block.get("type") == "text" and block.get("text")
+                            ])
+                            return
+
+                        elif msg_type == "res" and data.get("id") == req_id:
+                            if not data.get("ok"):
+                                raise Exception(f"chat.send failed: {data.get('error')}")
+                            initial_response_received = True
+                            # Continue to collect turn events
+
+            # One deadline for the whole turn rather than a fresh timer per event
+            try:
+                await asyncio.wait_for(collect(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # If we got some content, return it
+                if not response:
                     # Provide more context about what we were waiting for
                     if initial_response_received:
                         raise Exception("Timeout waiting for final response content (got initial response but no content)")
@@ -488,10 +1069,10 @@ class MoltbotClient:
 
         finally:
             # Clean up pending request
-            if req_id in self._pending_requests:
-                del self._pending_requests[req_id]
-
-        response = "".join(response_content) if response_content else ""
+            conn.pending_requests.pop(req_id, None)
+            conn.by_session_key.pop(session_key, None)
+            if request_info.run_id:
+                conn.by_run_id.pop(request_info.run_id, None)
 
         # Validate response is not empty
         if not response or not response.strip():
@@ -517,22 +1098,30 @@ class MoltbotClient:
         except Exception:
             return False
 
+    async def __aenter__(self) -> "MoltbotClient":
+        """Use the client as an async context manager (connects lazily on first use)."""
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        """Flush pending cleanups and release the shared connection."""
+        await self.disconnect()
+
     async def disconnect(self):
-        """Disconnect from Moltbot."""
-        self._connected = False
+        """
+        Disconnect from Moltbot (the socket closes once no client uses it).
 
-        # Cancel receiver task
-        if self._receiver_task:
-            self._receiver_task.cancel()
+        Sessions still queued for cleanup are removed first.
+        """
+        if self._cleanup_task is not None:
+            if not self._cleanup_task.done():
+                await self._cleanup_queue.join()
+            self._cleanup_task.cancel()
             try:
-                await self._receiver_task
+                await self._cleanup_task
             except asyncio.CancelledError:
                 pass
-            self._receiver_task = None
+            self._cleanup_task = None
 
-        if self._ws:
-            await self._ws.close()
-            self._ws = None
-
-        # Clear pending requests
-        self._pending_requests.clear()
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await conn.release()
@@ -6,61 +6,40 @@ Supports:
 - launchd (macOS)
 """
 
+import functools
 import os
+import re
+import shlex
 import shutil
 import subprocess
 import sys
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+from xml.sax.saxutils import escape as xml_escape
+
+from .fileio import replace_file
 
 # Service names
 SYSTEMD_SERVICE_NAME = "agentwatch-cli"
 LAUNCHD_SERVICE_NAME = "io.agentwatch.cli"
 
+# Current platform, resolved once at import
+if sys.platform == "darwin":
+    PLATFORM = "macos"
+elif sys.platform.startswith("linux"):
+    PLATFORM = "linux"
+else:
+    PLATFORM = "unsupported"
 
-def get_platform() -> str:
-    """Get the current platform."""
-    if sys.platform == "darwin":
-        return "macos"
-    elif sys.platform.startswith("linux"):
-        return "linux"
-    else:
-        return "unsupported"
-
-
-def get_executable_path() -> str:
-    """Get the path to the agentwatch-cli executable."""
-    # Try to find it in PATH
-    executable = shutil.which("agentwatch-cli")
-    if executable:
-        return executable
-
-    # Check user scripts directory (pip install --user)
-    import sysconfig
-    user_scripts = sysconfig.get_path("scripts", "posix_user")
-    if user_scripts:
-        candidate = Path(user_scripts) / "agentwatch-cli"
-        if candidate.exists():
-            return str(candidate)
-
-    # Fallback: assume it's in the same location as python
-    python_path = Path(sys.executable)
-    bin_dir = python_path.parent
-    candidate = bin_dir / "agentwatch-cli"
-    if candidate.exists():
-        return str(candidate)
-
-    # Last resort: use the module directly
-    return f"{sys.executable} -m agentwatch_cli"
+# "PID" entry in `launchctl list <label>` output
+_LAUNCHCTL_PID_RE = re.compile(r'"PID"\s*=\s*(\d+);')
 
 
-def get_systemd_service_content(user: str, executable: str, home_dir: str) -> str:
-    """Generate systemd service file content."""
-    return f"""[Unit]
+# Service file templates, filled in with str.format_map()
+_SYSTEMD_TEMPLATE = """[Unit]
 Description=AgentWatch CLI Connector
 Documentation=https://github.com/helivan-research/agentwatch-cli
-After=network-online.target
-Wants=network-online.target
+After=network.target
 
 [Service]
 Type=simple
@@ -81,22 +60,12 @@ SyslogIdentifier=agentwatch-cli
 WantedBy=multi-user.target
 """
 
-
-def get_launchd_plist_content(executable: str, home_dir: str) -> str:
-    """Generate launchd plist file content."""
-    # Handle case where executable might have spaces or be a python -m command
-    if " " in executable:
-        parts = executable.split()
-        program_args = "\n".join(f"        <string>{p}</string>" for p in parts)
-    else:
-        program_args = f"        <string>{executable}</string>"
-
-    return f"""<?xml version="1.0" encoding="UTF-8"?>
+_LAUNCHD_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
 <plist version="1.0">
 <dict>
     <key>Label</key>
-    <string>{LAUNCHD_SERVICE_NAME}</string>
+    <string>{label}</string>
 
     <key>ProgramArguments</key>
     <array>
@@ -134,35 +103,149 @@ def get_launchd_plist_content(executable: str, home_dir: str) -> str:
 """
 
 
+def get_platform() -> str:
+    """Get the current platform."""
+    return PLATFORM
+
+
+@functools.lru_cache(maxsize=1)
+def get_executable_path() -> str:
+    """Get the path to the agentwatch-cli executable (resolved once per process)."""
+    # Try to find it in PATH
+    executable = shutil.which("agentwatch-cli")
+    if executable:
+        return executable
+
+    # Check user scripts directory (pip install --user)
+    import sysconfig
+    user_scripts = sysconfig.get_path("scripts", "posix_user")
+    if user_scripts:
+        candidate = Path(user_scripts) / "agentwatch-cli"
+        if candidate.exists():
+            return str(candidate)
+
+    # Fallback: assume it's in the same location as python
+    python_path = Path(sys.executable)
+    bin_dir = python_path.parent
+    candidate = bin_dir / "agentwatch-cli"
+    if candidate.exists():
+        return str(candidate)
+
+    # Ask the installed distribution where its console script went
+    # (covers install prefixes that are neither on PATH nor next to python)
+    from importlib.metadata import PackageNotFoundError, distribution
+    try:
+        for file in distribution("agentwatch-cli").files or ():
+            if file.name == "agentwatch-cli":
+                candidate = Path(os.path.normpath(file.locate()))
+                if candidate.exists():
+                    return str(candidate)
+    except PackageNotFoundError:
+        pass
+
+    # Last resort: use the module directly (shell-quoted, as the python
+    # path may contain spaces)
+    return " ".join(shlex.quote(arg) for arg in (sys.executable, "-m", "agentwatch_cli"))
+
+
+@functools.lru_cache(maxsize=8)
+def _home_for(user: Optional[str]) -> str:
+    """Get the home directory of a user (the current user if None)."""
+    if user is None:
+        return str(Path.home())
+    return str(Path(f"~{user}").expanduser())
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Write content to path unless the file already holds exactly that content.
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    data = content.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    replace_file(path, data)
+    return True
+
+
+def get_systemd_service_content(user: str, executable: str, home_dir: str) -> str:
+    """Generate systemd service file content."""
+    return _SYSTEMD_TEMPLATE.format_map(
+        {"user": user, "executable": executable, "home_dir": home_dir}
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _launchd_program_args(executable: str) -> str:
+    """Render the ProgramArguments <string> entries for an executable command."""
+    # An existing path is one argument even if it contains spaces;
+    # otherwise it is a shell-quoted command such as "python -m agentwatch_cli"
+    parts = [executable] if os.path.exists(executable) else shlex.split(executable)
+    return "\n".join(f"        <string>{xml_escape(p)}</string>" for p in parts)
+
+
+def get_launchd_plist_content(executable: str, home_dir: str) -> str:
+    """Generate launchd plist file content."""
+    return _LAUNCHD_TEMPLATE.format_map(
+        {"label": LAUNCHD_SERVICE_NAME, "program_args": _launchd_program_args(executable), "home_dir": home_dir}
+    )
+
+
+def _run_command(args: List[str], check: bool = True) -> subprocess.CompletedProcess:
+    """
+    Run a systemctl/launchctl command whose output is not needed.
+
+    stdout is discarded. With check=True, stderr is captured so a failure
+    (CalledProcessError) can report it; otherwise it is discarded too.
+    """
+    return subprocess.run(
+        args,
+        check=check,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE if check else subprocess.DEVNULL,
+        text=True,
+    )
+
+
+def _command_error(e: subprocess.CalledProcessError) -> str:
+    """Describe a failed command, including its stderr if any."""
+    stderr = (e.stderr or "").strip()
+    return f"{e} {stderr}" if stderr else str(e)
+
+
 def install_systemd_service(user: Optional[str] = None) -> Tuple[bool, str]:
     """Install systemd service (Linux)."""
     if os.geteuid() != 0:
         return False, "Root privileges required. Run with: sudo agentwatch-cli install-service"
 
-    user = user or os.environ.get("SUDO_USER") or os.getlogin()
-    home_dir = str(Path(f"~{user}").expanduser())
+    if not user:
+        import pwd
+        user = os.environ.get("SUDO_USER") or pwd.getpwuid(os.getuid()).pw_name
+    home_dir = _home_for(user)
     executable = get_executable_path()
 
     service_content = get_systemd_service_content(user, executable, home_dir)
     service_path = Path(f"/etc/systemd/system/{SYSTEMD_SERVICE_NAME}.service")
 
     try:
-        # Write service file
-        service_path.write_text(service_content)
-
-        # Reload systemd
-        subprocess.run(["systemctl", "daemon-reload"], check=True)
+        # Write service file; reload systemd only if the unit changed
+        if write_if_changed(service_path, service_content):
+            _run_command(["systemctl", "daemon-reload"])
 
-        # Enable service
-        subprocess.run(["systemctl", "enable", SYSTEMD_SERVICE_NAME], check=True)
-
-        # Start service
-        subprocess.run(["systemctl", "start", SYSTEMD_SERVICE_NAME], check=True)
+        # Enable and start service in one transaction
+        _run_command(["systemctl", "enable", "--now", SYSTEMD_SERVICE_NAME])
 
         return True, f"""Service installed successfully!
 
 The connector will now:
-- Start automatically on boot
+- Start automatically on boot, as soon as basic networking is up
+  (it is restarted every 10s until the gateway and cloud are reachable)
 - Restart if it crashes
 - Run as user: {user}
 
@@ -173,7 +256,7 @@ Useful commands:
   journalctl -u {SYSTEMD_SERVICE_NAME} -f        # View logs
 """
     except subprocess.CalledProcessError as e:
-        return False, f"Failed to install service: {e}"
+        return False, f"Failed to install service: {_command_error(e)}"
     except Exception as e:
         return False, f"Error: {e}"
 
@@ -186,50 +269,58 @@ def uninstall_systemd_service() -> Tuple[bool, str]:
     service_path = Path(f"/etc/systemd/system/{SYSTEMD_SERVICE_NAME}.service")
 
     try:
-        # Stop service
-        subprocess.run(["systemctl", "stop", SYSTEMD_SERVICE_NAME], check=False)
-
-        # Disable service
-        subprocess.run(["systemctl", "disable", SYSTEMD_SERVICE_NAME], check=False)
+        # Stop and disable service in one transaction
+        _run_command(["systemctl", "disable", "--now", SYSTEMD_SERVICE_NAME], check=False)
 
         # Remove service file
         if service_path.exists():
             service_path.unlink()
 
         # Reload systemd
-        subprocess.run(["systemctl", "daemon-reload"], check=True)
+        _run_command(["systemctl", "daemon-reload"])
 
         return True, "Service uninstalled successfully."
+    except subprocess.CalledProcessError as e:
+        return False, f"Error: {_command_error(e)}"
     except Exception as e:
         return False, f"Error: {e}"
 
 
+def _launchd_service_loaded() -> bool:
+    """Check whether the launchd service is currently loaded."""
+    return _run_command(["launchctl", "list", LAUNCHD_SERVICE_NAME], check=False).returncode == 0
+
+
 def install_launchd_service() -> Tuple[bool, str]:
     """Install launchd service (macOS)."""
-    home_dir = str(Path.home())
+    home_dir = _home_for(None)
     executable = get_executable_path()
 
     plist_content = get_launchd_plist_content(executable, home_dir)
-    plist_dir = Path(home_dir) / "Library" / "LaunchAgents"
+    library_dir = Path(home_dir) / "Library"
+    plist_dir = library_dir / "LaunchAgents"
     plist_path = plist_dir / f"{LAUNCHD_SERVICE_NAME}.plist"
-
-    # Create logs directory
-    logs_dir = Path(home_dir) / "Library" / "Logs"
-    logs_dir.mkdir(parents=True, exist_ok=True)
+    logs_dir = library_dir / "Logs"
 
     try:
-        # Create LaunchAgents directory if needed
-        plist_dir.mkdir(parents=True, exist_ok=True)
-
-        # Unload existing service if present
-        if plist_path.exists():
-            subprocess.run(["launchctl", "unload", str(plist_path)], check=False)
-
-        # Write plist file
-        plist_path.write_text(plist_content)
-
-        # Load service
-        subprocess.run(["launchctl", "load", str(plist_path)], check=True)
+        # Create LaunchAgents and logs directories if needed (sharing one
+        # walk up to ~/Library)
+        library_dir.mkdir(parents=True, exist_ok=True)
+        plist_dir.mkdir(exist_ok=True)
+        logs_dir.mkdir(exist_ok=True)
+
+        # Write plist file; nothing else to do if the same plist is
+        # already installed and loaded
+        changed = write_if_changed(plist_path, plist_content)
+        loaded = _launchd_service_loaded()
+        if changed or not loaded:
+            # Unload the running job first (the label never changes, so the
+            # new plist identifies the old job too)
+            if loaded:
+                _run_command(["launchctl", "unload", str(plist_path)], check=False)
+
+            # Load service
+            _run_command(["launchctl", "load", str(plist_path)])
 
         return True, f"""Service installed successfully!
 
@@ -247,20 +338,20 @@ Logs:
   tail -f ~/Library/Logs/agentwatch-cli.error.log
 """
     except subprocess.CalledProcessError as e:
-        return False, f"Failed to install service: {e}"
+        return False, f"Failed to install service: {_command_error(e)}"
     except Exception as e:
         return False, f"Error: {e}"
 
 
 def uninstall_launchd_service() -> Tuple[bool, str]:
     """Uninstall launchd service (macOS)."""
-    home_dir = str(Path.home())
+    home_dir = _home_for(None)
     plist_path = Path(home_dir) / "Library" / "LaunchAgents" / f"{LAUNCHD_SERVICE_NAME}.plist"
 
     try:
         # Unload service
         if plist_path.exists():
-            subprocess.run(["launchctl", "unload", str(plist_path)], check=False)
+            _run_command(["launchctl", "unload", str(plist_path)], check=False)
             plist_path.unlink()
 
         return True, "Service uninstalled successfully."
@@ -270,66 +361,94 @@ def uninstall_launchd_service() -> Tuple[bool, str]:
 
 def install_service(user: Optional[str] = None) -> Tuple[bool, str]:
     """Install the service for the current platform."""
-    platform = get_platform()
-
-    if platform == "linux":
+    if PLATFORM == "linux":
         return install_systemd_service(user)
-    elif platform == "macos":
+    elif PLATFORM == "macos":
         return install_launchd_service()
     else:
         return False, f"Unsupported platform: {sys.platform}"
 
 
+def install_service_and_status(user: Optional[str] = None) -> Tuple[bool, str, bool, str]:
+    """
+    Install the service and report its status in one call.
+
+    Args:
+        user: User to run the service as (Linux only)
+
+    Returns:
+        Tuple of (installed, install message, is_running, status message).
+        The status is only queried if the install succeeded.
+    """
+    installed, message = install_service(user)
+    if not installed:
+        return False, message, False, ""
+
+    is_running, status = get_service_status()
+    return True, message, is_running, status
+
+
 def uninstall_service() -> Tuple[bool, str]:
     """Uninstall the service for the current platform."""
-    platform = get_platform()
-
-    if platform == "linux":
+    if PLATFORM == "linux":
         return uninstall_systemd_service()
-    elif platform == "macos":
+    elif PLATFORM == "macos":
         return uninstall_launchd_service()
     else:
         return False, f"Unsupported platform: {sys.platform}"
 
 
-def get_service_status() -> Tuple[bool, str]:
-    """Get the service status for the current platform."""
-    platform = get_platform()
+def get_service_status(verbose: bool = False) -> Tuple[bool, str]:
+    """
+    Get the service status for the current platform.
 
-    try:
-        if platform == "linux":
-            result = subprocess.run(
-                ["systemctl", "is-active", SYSTEMD_SERVICE_NAME],
-                capture_output=True,
-                text=True
-            )
-            is_active = result.returncode == 0
-            status = result.stdout.strip()
+    Args:
+        verbose: Also include full `systemctl status` output (Linux only)
 
-            # Get more details
+    Returns:
+        Tuple of (is_running, status message)
+    """
+    try:
+        if PLATFORM == "linux":
+            # One call for the unit state, without status' log formatting
             result = subprocess.run(
-                ["systemctl", "status", SYSTEMD_SERVICE_NAME, "--no-pager", "-l"],
+                ["systemctl", "show", SYSTEMD_SERVICE_NAME, "--property=ActiveState,SubState,MainPID"],
                 capture_output=True,
                 text=True
             )
-            details = result.stdout
-
-            return is_active, f"Status: {status}\n\n{details}"
-
-        elif platform == "macos":
+            props = dict(line.partition("=")[::2] for line in result.stdout.splitlines())
+            state = props.get("ActiveState") or "unknown"
+            sub_state = props.get("SubState") or "unknown"
+            pid = props.get("MainPID", "0")
+            is_active = state == "active"
+
+            message = f"Status: {state} ({sub_state})\nPID: {pid if pid != '0' else 'not running'}"
+
+            # Full status (including recent logs) only on request
+            if verbose:
+                result = subprocess.run(
+                    ["systemctl", "status", SYSTEMD_SERVICE_NAME, "--no-pager", "-l"],
+                    capture_output=True,
+                    text=True
+                )
+                message += f"\n\n{result.stdout}"
+
+            return is_active, message
+
+        elif PLATFORM == "macos":
+            # Ask about our job only instead of scanning every loaded job
             result = subprocess.run(
-                ["launchctl", "list"],
+                ["launchctl", "list", LAUNCHD_SERVICE_NAME],
                 capture_output=True,
                 text=True
             )
+            if result.returncode != 0:
+                return False, "Service not installed"
 
-            for line in result.stdout.split("\n"):
-                if LAUNCHD_SERVICE_NAME in line:
-                    parts = line.split()
-                    pid = parts[0] if parts[0] != "-" else "not running"
-                    return parts[0] != "-", f"Service: {LAUNCHD_SERVICE_NAME}\nPID: {pid}"
-
-            return False, "Service not installed"
+            # The job's "PID" key is only present while it is running
+            match = _LAUNCHCTL_PID_RE.search(result.stdout)
+            pid = match.group(1) if match else "not running"
+            return match is not None, f"Service: {LAUNCHD_SERVICE_NAME}\nPID: {pid}"
         else:
             return False, f"Unsupported platform: {sys.platform}"
 
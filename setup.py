@@ -33,6 +33,12 @@ setup(
         "python-socketio>=5.8.0",
         "websockets>=12.0,<15.1",
     ],
+    extras_require={
+        "speedups": [
+            "orjson>=3.9",
+            "uvloop>=0.17; sys_platform != 'win32'",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "agentwatch-cli=agentwatch_cli.cli:main",